@@ -6,6 +6,14 @@ from dotenv import load_dotenv
 import plotly.express as px
 from streamlit_plotly_events import plotly_events
 from pathlib import Path
+from datetime import datetime
+import sys
+
+# Shared warehouse helpers live alongside the ETL
+sys.path.append(str(Path(__file__).resolve().parent.parent / "etl"))
+from query_profiling import maybe_enable_profiling
+from sales_snapshot import current_snapshot, read_snapshot
+from transform import CATEGORY_COLS
 
 # Load environment variables
 load_dotenv()
@@ -17,6 +25,7 @@ if not DB_URI:
 
 # Connect to DB
 engine = create_engine(DB_URI)
+maybe_enable_profiling(engine, "dashboard")
 
 US_STATES = [
     "AL","AK","AZ","AR","CA","CO","CT","DE","FL","GA",
@@ -31,20 +40,36 @@ def load_sql_query(path:None):
         path = Path(__file__).resolve().parent.parent / "sql" / "analytics_query.sql"
     return Path(path).read_text(encoding="utf-8")
 
+# One memory-mapped frame per snapshot version, shared by every session in
+# this process (cache_data would pickle a private copy per session)
+@st.cache_resource(max_entries=2)
+def load_snapshot(path: str):
+    return read_snapshot(path)
+
+def load_data(demo_mode: bool, selected_year: int, snapshot=None):
+    if snapshot is not None:
+        return load_snapshot(str(snapshot))
+
+    return load_query_data(demo_mode, selected_year)
+
 @st.cache_data(ttl=600)
-def load_data(demo_mode: bool, selected_year: int):
+def load_query_data(demo_mode: bool, selected_year: int):
     if demo_mode:
-        df = pd.read_csv("data/SAMPLE_ETL_CMS_1500.csv")
+        df = pd.read_csv(
+            "data/SAMPLE_ETL_CMS_1500.csv",
+            dtype={col: "category" for col in CATEGORY_COLS}
+        )
         return df[df["sale_year"] == selected_year]
 
     # Production mode → aggregated SQL ONLY
     sql = load_sql_query(None)
 
-    return pd.read_sql(
+    df = pd.read_sql(
         sql,
         engine,
         params={"sale_year": selected_year}
     )
+    return df.astype({col: "category" for col in CATEGORY_COLS})
 
 def format_currency_abbrev(value):
     if value >= 1_000_000_000:
@@ -81,7 +106,11 @@ region_view = st.sidebar.radio(
     index=0
 )
 
-df = load_data(demo_mode, selected_year)
+# Published snapshot wins; re-checked every run so a new version is
+# picked up as soon as its pointer is swapped
+snapshot = None if demo_mode else current_snapshot(selected_year)
+
+df = load_data(demo_mode, selected_year, snapshot)
 
 # Unique states from the loaded DataFrame
 state_options = sorted(df["state"].unique())
@@ -113,6 +142,9 @@ st.title("Pharma KPI Dashboard")
 st.markdown("Interactive insights from CMS Medicare Part D data")
 if demo_mode:
     st.info("Demo Mode enabled — using 1,500-row sample dataset")
+elif snapshot is not None:
+    published = datetime.fromtimestamp(snapshot.stat().st_mtime)
+    st.success(f"Serving warehouse snapshot {snapshot.name} (published {published:%Y-%m-%d %H:%M})")
 else:
     st.success("Connected to PostgreSQL warehouse")
 
@@ -120,13 +152,13 @@ else:
 # Top 10 Drugs by State/Region
 # ------------------------------
 drug_state_df = (
-    filtered_df.groupby(["state", "drug_name"], as_index=False)
+    filtered_df.groupby(["state", "drug_name"], as_index=False, observed=True)
       .agg(total_sales=("sales_amount", "sum"))
 )
 
 # Total sales per state
 state_totals = (
-    drug_state_df.groupby("state", as_index=False)
+    drug_state_df.groupby("state", as_index=False, observed=True)
     .agg(state_total=("total_sales", "sum"))
 )
 
@@ -138,7 +170,7 @@ drug_state_df["pct_of_state"] = (
 
 # Rank drugs per state
 drug_state_df["rank"] = (
-    drug_state_df.groupby("state")["total_sales"]
+    drug_state_df.groupby("state", observed=True)["total_sales"]
     .rank(method="first", ascending=False)
 )
 
@@ -151,7 +183,7 @@ top10_by_state = drug_state_df[
 # ------------------------------
 top_drugs_df = (
     filtered_df
-    .groupby("drug_name", as_index=False)
+    .groupby("drug_name", as_index=False, observed=True)
     .agg(total_sales=("sales_amount", "sum"))
     .sort_values("total_sales", ascending=False)
     .head(10)
@@ -166,16 +198,16 @@ top_drugs_df["sales_label"] = top_drugs_df["total_sales"].apply(
 # ------------------------------
 tmp = filtered_df.copy()
 
-tmp["drug_name_norm"] = tmp["drug_name"].astype(str).str.strip().str.lower()
-tmp["generic_name_norm"] = tmp["generic_name"].astype(str).str.strip().str.lower()
+# .str on categorical columns normalizes each distinct name once
+tmp["drug_name_norm"] = tmp["drug_name"].str.strip().str.lower()
+tmp["generic_name_norm"] = tmp["generic_name"].str.strip().str.lower()
 
 # Generic if brand name == generic name (common rule for CMS Part D)
-tmp["drug_type"] = tmp.apply(
-    lambda r: "Generic"
-    if pd.notna(r["generic_name"]) and r["generic_name_norm"] != "nan" and r["drug_name_norm"] == r["generic_name_norm"]
-    else "Brand",
-    axis=1
+is_generic = (
+    tmp["generic_name"].notna()
+    & (tmp["drug_name_norm"] == tmp["generic_name_norm"])
 )
+tmp["drug_type"] = is_generic.map({True: "Generic", False: "Brand"})
 
 bg_df = (
     tmp.groupby("drug_type", as_index=False)
@@ -193,7 +225,7 @@ bg_df["sales_label"] = bg_df["total_sales"].apply(format_currency_abbrev)
 # ------------------------------
 state_sales_df = (
     filtered_df
-    .groupby("state", as_index=False)
+    .groupby("state", as_index=False, observed=True)
     .agg(total_sales=("sales_amount", "sum"))
 )
 
@@ -225,7 +257,7 @@ avg_cost = (
 )
 # Compute total sales by state/region
 region_sales = (
-    filtered_df.groupby("state", as_index=False)
+    filtered_df.groupby("state", as_index=False, observed=True)
     .agg(total_sales=("sales_amount", "sum"))
 )
 
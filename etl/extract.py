@@ -13,6 +13,19 @@ USE_COLS = [
     "Tot_Drug_Cst"
 ]
 
+# NPIs are 10-digit integers; repeated text columns are dictionary-encoded
+# so each distinct value is stored once per chunk.
+DTYPES = {
+    "Prscrbr_NPI": "Int64",
+    "Prscrbr_State_Abrvtn": "category",
+    "Prscrbr_Type": "category",
+    "Brnd_Name": "category",
+    "Gnrc_Name": "category"
+}
+
+# CMS suppression flag
+NA_VALUES = ["*"]
+
 def extract_data(csv_path, chunk_size=DEFAULT_CHUNK_SIZE):
     """
     Generates raw filtered CMS data chunks.
@@ -20,6 +33,8 @@ def extract_data(csv_path, chunk_size=DEFAULT_CHUNK_SIZE):
     return pd.read_csv(
         csv_path,
         usecols=USE_COLS,
+        dtype=DTYPES,
+        na_values=NA_VALUES,
         chunksize=chunk_size,
         low_memory=False
     )
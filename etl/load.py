@@ -1,21 +1,38 @@
-from sqlalchemy import text
+import os
+import time
+import queue
+import multiprocessing as mp
+import pandas as pd
+from sqlalchemy import create_engine, text
 from io import StringIO
+from query_profiling import maybe_enable_profiling, record_statement
+
+# Must match the partitions created in sql/schema.sql
+FACT_PARTITIONS = 8
+
+DEFAULT_LOAD_WORKERS = 4
+
+
+def _copy(conn, cur, sql, buf):
+    """
+    copy_expert plus a profiling record (COPY bypasses SQLAlchemy's cursor events).
+    """
+    t0 = time.perf_counter()
+    cur.copy_expert(sql, buf)
+    record_statement(conn, sql, (time.perf_counter() - t0) * 1000, cur.rowcount)
+
 
 def load_dimensions(df, engine):
     """
     Fast RDS-friendly dimension load:
-    COPY into temp tables, then INSERT DISTINCT ... ON CONFLICT DO NOTHING
+    COPY into temp tables, then INSERT DISTINCT ... ON CONFLICT DO NOTHING.
+    Returns (drug_keys, provider_keys) for the chunk's drugs and providers.
     """
     drugs = df[["drug_name", "generic_name"]].drop_duplicates().copy()
     providers = df[["prescriber_npi", "state", "provider_type"]].drop_duplicates().copy()
 
-    # Ensure simple Python/string types for CSV/COPY
-    drugs["drug_name"] = drugs["drug_name"].astype(str)
-    drugs["generic_name"] = drugs["generic_name"].astype("string")
-
-    providers["prescriber_npi"] = providers["prescriber_npi"].astype(str)
-    providers["state"] = providers["state"].astype(str)
-    providers["provider_type"] = providers["provider_type"].astype(str)
+    # Names stay categorical (to_csv writes the labels, NA as empty -> NULL);
+    # NPIs are already int64 from transform_chunk
 
     with engine.begin() as conn:
         conn.execute(text("SET LOCAL synchronous_commit = OFF;"))
@@ -29,7 +46,7 @@ def load_dimensions(df, engine):
             ) ON COMMIT DROP;
 
             CREATE TEMP TABLE temp_provider_dim (
-                prescriber_npi TEXT,
+                prescriber_npi BIGINT,
                 state TEXT,
                 provider_type TEXT
             ) ON COMMIT DROP;
@@ -48,11 +65,15 @@ def load_dimensions(df, engine):
         dbapi_conn = conn.connection.driver_connection  # SQLAlchemy 2.x + psycopg2
         cur = dbapi_conn.cursor()
         try:
-            cur.copy_expert(
+            _copy(
+                conn,
+                cur,
                 "COPY temp_drug_dim (drug_name, generic_name) FROM STDIN WITH (FORMAT CSV)",
                 drug_buf
             )
-            cur.copy_expert(
+            _copy(
+                conn,
+                cur,
                 "COPY temp_provider_dim (prescriber_npi, state, provider_type) FROM STDIN WITH (FORMAT CSV)",
                 prov_buf
             )
@@ -76,71 +97,154 @@ def load_dimensions(df, engine):
             ON CONFLICT (prescriber_npi) DO NOTHING;
         """))
 
+        # Surrogate keys for this chunk, so facts can be keyed client-side
+        drug_keys = pd.read_sql(text("""
+            SELECT d.drug_name, d.drug_id
+            FROM dim_drug d
+            WHERE d.drug_name IN (SELECT drug_name FROM temp_drug_dim);
+        """), conn)
+
+        provider_keys = pd.read_sql(text("""
+            SELECT p.prescriber_npi, p.provider_id
+            FROM dim_provider p
+            WHERE p.prescriber_npi IN (SELECT prescriber_npi FROM temp_provider_dim);
+        """), conn)
 
+    return drug_keys, provider_keys
 
 
-def load_facts(df, engine):
+def build_facts(df, drug_keys, provider_keys):
     """
-    Faster fact load:
-    COPY into TEMP, ANALYZE, then set-based INSERT JOIN.
-    No temp indexes per chunk.
+    Resolves surrogate keys for a transformed chunk.
+    Inner joins, so unmatched rows are dropped as the old INSERT ... JOIN did.
     """
-    sale_year = int(df["sale_year"].iloc[0])
+    facts = (
+        df[["prescriber_npi", "drug_name", "sale_year", "total_claims", "sales_amount"]]
+        .merge(provider_keys, on="prescriber_npi")
+        .merge(drug_keys.astype({"drug_name": df["drug_name"].dtype}), on="drug_name")
+    )
 
-    stage = df[["prescriber_npi", "drug_name", "total_claims", "sales_amount"]].copy()
-    stage["prescriber_npi"] = stage["prescriber_npi"].astype(str)
-    stage["drug_name"] = stage["drug_name"].astype(str)
-    stage["total_claims"] = stage["total_claims"].astype("Int64")
-    stage["sales_amount"] = stage["sales_amount"].astype(float)
+    facts = facts[["drug_id", "provider_id", "sale_year", "total_claims", "sales_amount"]]
+    facts["total_claims"] = facts["total_claims"].astype("Int64")
+    facts["sales_amount"] = facts["sales_amount"].astype(float)
+
+    return facts
+
+
+def split_by_partition(facts):
+    """
+    Yields (partition, rows) pairs following fact_sales' provider_id % FACT_PARTITIONS key.
+    """
+    for partition, rows in facts.groupby(facts["provider_id"] % FACT_PARTITIONS):
+        yield int(partition), rows
+
+
+def load_fact_partition(facts, engine, partition):
+    """
+    COPY pre-keyed fact rows straight into one fact_sales partition.
+    No staging table, no join, no shared sequence.
+    """
+    buf = StringIO()
+    facts.to_csv(buf, index=False, header=False)
+    buf.seek(0)
 
     with engine.begin() as conn:
         conn.execute(text("SET LOCAL synchronous_commit = OFF;"))
-        conn.execute(text("SET LOCAL work_mem = '64MB';"))
-        
-        # Temp table per transaction
-        conn.execute(text("""
-            CREATE TEMP TABLE temp_fact (
-                prescriber_npi TEXT,
-                drug_name TEXT,
-                total_claims BIGINT,
-                sales_amount DOUBLE PRECISION
-            ) ON COMMIT DROP;
-        """))
-
-        csv_buf = StringIO()
-        stage.to_csv(csv_buf, index=False, header=False)
-        csv_buf.seek(0)
 
         dbapi_conn = conn.connection.driver_connection
         cur = dbapi_conn.cursor()
         try:
-            cur.copy_expert(
-                "COPY temp_fact (prescriber_npi, drug_name, total_claims, sales_amount) FROM STDIN WITH (FORMAT CSV)",
-                csv_buf
+            _copy(
+                conn,
+                cur,
+                f"COPY fact_sales_p{partition} (drug_id, provider_id, sale_year, total_claims, sales_amount) "
+                "FROM STDIN WITH (FORMAT CSV)",
+                buf
             )
         finally:
             cur.close()
 
-        # Help the planner choose good joins on temp table
-        conn.execute(text("ANALYZE temp_fact;"))
 
-        conn.execute(text("""
-            INSERT INTO fact_sales (
-                drug_id,
-                provider_id,
-                sale_year,
-                total_claims,
-                sales_amount
-            )
-            SELECT
-                d.drug_id,
-                p.provider_id,
-                :sale_year,
-                tf.total_claims,
-                tf.sales_amount
-            FROM temp_fact tf
-            JOIN dim_drug d
-              ON tf.drug_name = d.drug_name
-            JOIN dim_provider p
-              ON tf.prescriber_npi = p.prescriber_npi;
-        """), {"sale_year": sale_year})
+def _fact_loader_worker(db_uri, inbox):
+    engine = create_engine(db_uri)
+    maybe_enable_profiling(engine, "etl")
+    try:
+        while True:
+            item = inbox.get()
+            if item is None:
+                break
+
+            partition, facts = item
+            load_fact_partition(facts, engine, partition)
+    finally:
+        engine.dispose()
+
+
+class FactLoaderPool:
+    """
+    Parallel fact loading: worker w owns every partition p with p % workers == w,
+    so no two workers ever write to the same partition heap or indexes.
+    With workers <= 1 rows are loaded inline in the calling process.
+    """
+
+    def __init__(self, db_uri, workers=DEFAULT_LOAD_WORKERS, queue_size=4):
+        self.workers = max(1, min(workers, FACT_PARTITIONS))
+        self.inboxes = []
+        self.procs = []
+        self.engine = None
+
+        if self.workers == 1:
+            self.engine = create_engine(db_uri)
+            maybe_enable_profiling(self.engine, "etl")
+            return
+
+        for _ in range(self.workers):
+            # Bounded so a slow worker applies backpressure to extraction
+            inbox = mp.Queue(maxsize=queue_size)
+            proc = mp.Process(target=_fact_loader_worker, args=(db_uri, inbox), daemon=True)
+            proc.start()
+            self.inboxes.append(inbox)
+            self.procs.append(proc)
+
+    def submit(self, facts):
+        for partition, rows in split_by_partition(facts):
+            if self.engine is not None:
+                load_fact_partition(rows, self.engine, partition)
+                continue
+
+            self._put(partition % self.workers, (partition, rows))
+
+    def _put(self, owner, item):
+        # Never block on a full queue whose worker has died
+        while True:
+            if not self.procs[owner].is_alive():
+                raise RuntimeError(f"Fact loader worker {owner} exited with code {self.procs[owner].exitcode}")
+            try:
+                self.inboxes[owner].put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def close(self):
+        if self.engine is not None:
+            self.engine.dispose()
+            return
+
+        try:
+            for owner in range(self.workers):
+                try:
+                    self._put(owner, None)
+                except RuntimeError:
+                    pass  # already dead, reported below
+
+            for proc in self.procs:
+                proc.join()
+        finally:
+            # A dead worker's queue still has a feeder thread blocked writing
+            # into a pipe nobody reads; don't let interpreter exit wait on it
+            for inbox in self.inboxes:
+                inbox.cancel_join_thread()
+
+        failed = [w for w, proc in enumerate(self.procs) if proc.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Fact loader workers failed: {failed}")
@@ -3,7 +3,8 @@ from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
 from extract import extract_data
 from transform import transform_chunk
-from load import load_dimensions, load_facts
+from load import load_dimensions, build_facts, FactLoaderPool, DEFAULT_LOAD_WORKERS
+from query_profiling import maybe_enable_profiling
 from pathlib import Path
 import time
 
@@ -26,30 +27,54 @@ def run_schema(engine, schema_path=None):
 if not CSV_PATH or not DB_URI:
     raise ValueError("Missing environment variables: CSV_PATH or DB_URI")
 
-engine = create_engine(DB_URI)
 
-print("Creating schema...", flush=True)
-run_schema(engine)
-print("Schema ready. Beginning chunk loop...", flush=True)
+def main():
+    engine = create_engine(DB_URI)
+    maybe_enable_profiling(engine, "etl")
 
-i = 0
+    # Read after load_dotenv() so a value in .env is honored
+    load_workers = int(os.getenv("LOAD_WORKERS", DEFAULT_LOAD_WORKERS))
 
-for raw_chunk in extract_data(CSV_PATH):
-    i += 1
+    print("Creating schema...", flush=True)
+    run_schema(engine)
 
-    transformed = transform_chunk(raw_chunk)
+    # Drop pooled connections before forking so workers don't inherit the sockets
+    engine.dispose()
 
-    if transformed.empty:
-        continue
+    start = time.time()
+    fact_loaders = FactLoaderPool(DB_URI, load_workers)
+    print(f"Schema ready. Beginning chunk loop with {fact_loaders.workers} fact loader(s)...", flush=True)
 
-    t0 = time.time()
-    load_dimensions(transformed, engine)
-    print(f"Chunk {i}: Load Dimensions took {time.time()-t0:.1f}s")
+    try:
+        i = 0
 
-    t1 = time.time()
-    load_facts(transformed, engine)
-    print(f"Chunk {i}: Load Facts took {time.time()-t0:.1f}s")
+        for raw_chunk in extract_data(CSV_PATH):
+            i += 1
 
-    print(f"Chunk {i}: loaded ~{len(raw_chunk):,} raw rows, {len(transformed):,} transformed rows", flush=True)
+            transformed = transform_chunk(raw_chunk)
 
-print("ETL pipeline completed successfully.")
+            if transformed.empty:
+                continue
+
+            t0 = time.time()
+            drug_keys, provider_keys = load_dimensions(transformed, engine)
+            print(f"Chunk {i}: Load Dimensions took {time.time()-t0:.1f}s")
+
+            # Fact rows go to the per-partition workers; this only blocks
+            # when a worker's queue is full
+            t1 = time.time()
+            fact_loaders.submit(build_facts(transformed, drug_keys, provider_keys))
+            print(f"Chunk {i}: Dispatch Facts took {time.time()-t1:.1f}s")
+
+            print(f"Chunk {i}: loaded ~{len(raw_chunk):,} raw rows, {len(transformed):,} transformed rows", flush=True)
+    finally:
+        fact_loaders.close()
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE fact_sales;"))
+
+    print(f"ETL pipeline completed successfully in {time.time()-start:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import threading
+import weakref
+from pathlib import Path
+from sqlalchemy import event
+
+DEFAULT_PROFILE_LOG = Path(__file__).resolve().parent.parent / "profile" / "queries.jsonl"
+
+# Only reads are re-run under EXPLAIN ANALYZE: re-running DML after it has
+# already applied (e.g. an ON CONFLICT upsert) would plan a misleading no-op
+EXPLAINABLE = ("select", "with")
+
+# engine -> Profiler, so non-SQLAlchemy work (COPY) can be logged too
+_profilers = weakref.WeakKeyDictionary()
+
+
+class Profiler:
+    """
+    Appends one JSON line per statement: source, statement, parameters,
+    duration and row count, plus an EXPLAIN (ANALYZE, BUFFERS) plan for
+    statements slower than explain_ms.
+    """
+
+    def __init__(self, source, log_path=DEFAULT_PROFILE_LOG, explain_ms=None):
+        self.source = source
+        self.log_path = Path(log_path)
+        self.explain_ms = explain_ms
+        self.lock = threading.Lock()
+
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            print(f"Query profiling log directory unavailable: {e!r}", file=sys.stderr, flush=True)
+
+    # Listeners run inside the caller's query path: profiling failures are
+    # reported and swallowed, never raised into the ETL or dashboard
+
+    # The start time rides on the per-execution context, so a statement that
+    # raises (and never reaches after_cursor_execute) leaves nothing behind
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._query_profiling_start = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        try:
+            duration_ms = (time.perf_counter() - context._query_profiling_start) * 1000
+
+            plan = None
+            if (
+                self.explain_ms is not None
+                and duration_ms >= self.explain_ms
+                and not executemany
+                and statement.lstrip().lower().startswith(EXPLAINABLE)
+            ):
+                plan = explain_analyze(cursor.connection, statement, parameters)
+
+            self.write(statement, parameters, duration_ms, cursor.rowcount, plan)
+        except Exception as e:
+            print(f"Query profiling failed: {e!r}", file=sys.stderr, flush=True)
+
+    def write(self, statement, parameters, duration_ms, rows, plan=None):
+        try:
+            self._append(statement, parameters, duration_ms, rows, plan)
+        except Exception as e:
+            print(f"Query profiling log write failed: {e!r}", file=sys.stderr, flush=True)
+
+    def _append(self, statement, parameters, duration_ms, rows, plan):
+        record = {
+            "ts": time.time(),
+            "pid": os.getpid(),
+            "source": self.source,
+            "statement": " ".join(statement.split()),
+            "parameters": parameters,
+            "duration_ms": round(duration_ms, 3),
+            "rows": rows,
+            "plan": plan
+        }
+        line = json.dumps(record, default=str)
+
+        with self.lock:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def explain_analyze(dbapi_conn, statement, parameters):
+    """
+    Re-runs a statement under EXPLAIN (ANALYZE, BUFFERS) on the same
+    connection, so session temp tables are visible, and rolls it back.
+    """
+    if dbapi_conn.autocommit:
+        # No transaction to roll the re-run back in
+        return None
+
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute("SAVEPOINT profiling_explain")
+        try:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+            return cur.fetchone()[0]
+        except Exception as e:
+            return {"error": str(e)}
+        finally:
+            cur.execute("ROLLBACK TO SAVEPOINT profiling_explain")
+            cur.execute("RELEASE SAVEPOINT profiling_explain")
+    except Exception as e:
+        # Savepoint handling itself failed; leave the caller's transaction alone
+        return {"error": str(e)}
+    finally:
+        cur.close()
+
+
+def enable_profiling(engine, source, log_path=DEFAULT_PROFILE_LOG, explain_ms=None):
+    profiler = Profiler(source, log_path, explain_ms)
+    event.listen(engine, "before_cursor_execute", profiler.before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", profiler.after_cursor_execute)
+    _profilers[engine] = profiler
+    return profiler
+
+
+def maybe_enable_profiling(engine, source):
+    """
+    Opt-in via environment:
+    PROFILE_QUERIES=1, PROFILE_LOG=<path>, PROFILE_EXPLAIN_MS=<threshold>
+    """
+    if os.getenv("PROFILE_QUERIES", "0").lower() not in ("1", "true", "yes"):
+        return None
+
+    explain_ms = os.getenv("PROFILE_EXPLAIN_MS")
+
+    return enable_profiling(
+        engine,
+        source,
+        log_path=os.getenv("PROFILE_LOG", DEFAULT_PROFILE_LOG),
+        explain_ms=float(explain_ms) if explain_ms else None
+    )
+
+
+def record_statement(conn, statement, duration_ms, rows):
+    """
+    Logs work that bypasses SQLAlchemy's cursor events (e.g. COPY via copy_expert).
+    No-op unless profiling is enabled on the connection's engine.
+    """
+    profiler = _profilers.get(conn.engine)
+    if profiler is not None:
+        profiler.write(statement, None, duration_ms, rows)
+
+
+def top_statements(log_path=DEFAULT_PROFILE_LOG, limit=20):
+    """
+    Aggregates a profile log by statement, ordered by total time.
+    """
+    stats = {}
+
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            key = (record["source"], record["statement"])
+            s = stats.setdefault(key, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "plans": 0})
+            s["calls"] += 1
+            s["total_ms"] += record["duration_ms"]
+            s["max_ms"] = max(s["max_ms"], record["duration_ms"])
+            s["rows"] += max(record["rows"] or 0, 0)
+            s["plans"] += record["plan"] is not None
+
+    ranked = sorted(stats.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+
+    return [
+        {"source": source, "statement": statement, **s, "mean_ms": s["total_ms"] / s["calls"]}
+        for (source, statement), s in ranked[:limit]
+    ]
+
+
+def print_report(log_path=DEFAULT_PROFILE_LOG, limit=20):
+    print(f"{'total ms':>12} {'calls':>7} {'mean ms':>10} {'max ms':>10} {'rows':>12}  source  statement")
+
+    for s in top_statements(log_path, limit):
+        print(
+            f"{s['total_ms']:>12,.1f} {s['calls']:>7,} {s['mean_ms']:>10,.1f} {s['max_ms']:>10,.1f} "
+            f"{s['rows']:>12,}  {s['source']:<6}  {s['statement'][:100]}"
+        )
+
+
+if __name__ == "__main__":
+    # python etl/query_profiling.py [log_path] [limit]
+    print_report(
+        sys.argv[1] if len(sys.argv) > 1 else os.getenv("PROFILE_LOG", DEFAULT_PROFILE_LOG),
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    )
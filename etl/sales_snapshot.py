@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import pandas as pd
+import pyarrow.feather as feather
+from pathlib import Path
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from query_profiling import maybe_enable_profiling
+from transform import CATEGORY_COLS
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_SNAPSHOT_DIR = ROOT / "snapshots"
+
+
+def _resolve_snapshot_dir(snapshot_dir):
+    # Resolved per call, so SNAPSHOT_DIR from a .env loaded after import is honored
+    if snapshot_dir is None:
+        snapshot_dir = os.getenv("SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)
+    return Path(snapshot_dir)
+
+
+def _pointer_path(sale_year, snapshot_dir):
+    return Path(snapshot_dir) / f"sales_agg_{sale_year}.current"
+
+
+def publish_snapshot(engine, sale_year, snapshot_dir=None, keep=3):
+    """
+    Writes the aggregate view for one year to a new versioned Arrow IPC (Feather v2)
+    file, then atomically repoints sales_agg_<year>.current at it.
+    Uncompressed so readers can memory-map it zero-copy.
+    """
+    snapshot_dir = _resolve_snapshot_dir(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    sql = (ROOT / "sql" / "analytics_query.sql").read_text(encoding="utf-8")
+    df = pd.read_sql(sql, engine, params={"sale_year": sale_year})
+    df = df.astype({col: "category" for col in CATEGORY_COLS})
+    df["sales_amount"] = df["sales_amount"].astype(float)
+
+    version = f"sales_agg_{sale_year}_{time.strftime('%Y%m%dT%H%M%S')}_{os.getpid()}.arrow"
+    path = snapshot_dir / version
+
+    tmp = path.with_name(path.name + ".tmp")
+    feather.write_feather(df, tmp, compression="uncompressed")
+    os.replace(tmp, path)
+
+    pointer = _pointer_path(sale_year, snapshot_dir)
+    pointer_tmp = pointer.with_name(pointer.name + ".tmp")
+    pointer_tmp.write_text(version, encoding="utf-8")
+    os.replace(pointer_tmp, pointer)
+
+    # Old versions may still be mapped by dashboard workers: unlinking is
+    # safe on POSIX, and skipped where the OS refuses (Windows)
+    old = sorted(snapshot_dir.glob(f"sales_agg_{sale_year}_*.arrow"))[:-keep]
+    for stale in old:
+        try:
+            stale.unlink()
+        except OSError:
+            pass
+
+    return path
+
+
+def current_snapshot(sale_year, snapshot_dir=None):
+    """
+    Path of the currently published snapshot for a year, or None.
+    """
+    snapshot_dir = _resolve_snapshot_dir(snapshot_dir)
+    pointer = _pointer_path(sale_year, snapshot_dir)
+
+    try:
+        path = Path(snapshot_dir) / pointer.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+
+    return path if path.exists() else None
+
+
+def read_snapshot(path):
+    """
+    Memory-maps a snapshot. Non-null numeric columns are views onto the
+    mapped file (shared OS page cache); names come back as categoricals.
+    """
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+if __name__ == "__main__":
+    # python etl/sales_snapshot.py [sale_year]
+    load_dotenv()
+
+    DB_URI = os.getenv("DB_URI")
+    if not DB_URI:
+        raise ValueError("Missing environment variables: DB_URI")
+
+    engine = create_engine(DB_URI)
+    maybe_enable_profiling(engine, "snapshot")
+
+    sale_year = int(sys.argv[1]) if len(sys.argv) > 1 else 2023
+    path = publish_snapshot(engine, sale_year)
+    print(f"Published {path}")
@@ -2,12 +2,14 @@ import pandas as pd
 
 SALE_YEAR = 2023
 
+# Low-cardinality text columns, dictionary-encoded from extract to dashboard
+CATEGORY_COLS = ["state", "provider_type", "drug_name", "generic_name"]
+
 def transform_chunk(df: pd.DataFrame) -> pd.DataFrame:
     """
     Cleans and transforms extracted data chunks.
     """
-    # Replace suppression flags
-    df = df.replace("*", pd.NA)
+    # Suppression flags (*) are already parsed as NA by extract_data
 
     # Drop rows missing critical fields
     df = df.dropna(subset=[
@@ -30,10 +32,14 @@ def transform_chunk(df: pd.DataFrame) -> pd.DataFrame:
     # Add derived fields
     df["sale_year"] = SALE_YEAR
 
-    # Force Python native types
+    # Fixed-width numeric types: nullable Int64 claims, int64 NPIs
     df["total_claims"] = df["total_claims"].astype("Int64")
     df["sales_amount"] = df["sales_amount"].astype(float)
-    df["prescriber_npi"] = df["prescriber_npi"].astype(str)
+    df["prescriber_npi"] = df["prescriber_npi"].astype("int64")
     df["sale_year"] = df["sale_year"].apply(lambda x: int(x) if pd.notna(x) else None)
 
+    # Keep names dictionary-encoded (categories shrink to surviving rows)
+    for col in CATEGORY_COLS:
+        df[col] = df[col].astype("category").cat.remove_unused_categories()
+
     return df
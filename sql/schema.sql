@@ -18,7 +18,7 @@ CREATE TABLE IF NOT EXISTS dim_drug (
 
 CREATE TABLE IF NOT EXISTS dim_provider (
     provider_id SERIAL PRIMARY KEY,
-    prescriber_npi TEXT UNIQUE,
+    prescriber_npi BIGINT UNIQUE,
     state TEXT,
     provider_type TEXT
 );
@@ -27,11 +27,23 @@ CREATE TABLE IF NOT EXISTS dim_provider (
 -- CREATE FACT TABLE
 -- ============================================
 
+-- Partitioned by provider_id % 8 so each parallel loader worker owns whole
+-- partitions and COPYs into them directly (see FACT_PARTITIONS in etl/load.py).
+-- No surrogate sale_id: a shared sequence would serialize the writers.
+
 CREATE TABLE IF NOT EXISTS fact_sales (
-    sale_id SERIAL PRIMARY KEY,
-    drug_id INTEGER REFERENCES dim_drug(drug_id),
-    provider_id INTEGER REFERENCES dim_provider(provider_id),
+    drug_id INTEGER NOT NULL REFERENCES dim_drug(drug_id),
+    provider_id INTEGER NOT NULL REFERENCES dim_provider(provider_id),
     sale_year INTEGER,
     total_claims INTEGER,
     sales_amount NUMERIC
-);
+) PARTITION BY LIST ((provider_id % 8));
+
+CREATE TABLE IF NOT EXISTS fact_sales_p0 PARTITION OF fact_sales FOR VALUES IN (0);
+CREATE TABLE IF NOT EXISTS fact_sales_p1 PARTITION OF fact_sales FOR VALUES IN (1);
+CREATE TABLE IF NOT EXISTS fact_sales_p2 PARTITION OF fact_sales FOR VALUES IN (2);
+CREATE TABLE IF NOT EXISTS fact_sales_p3 PARTITION OF fact_sales FOR VALUES IN (3);
+CREATE TABLE IF NOT EXISTS fact_sales_p4 PARTITION OF fact_sales FOR VALUES IN (4);
+CREATE TABLE IF NOT EXISTS fact_sales_p5 PARTITION OF fact_sales FOR VALUES IN (5);
+CREATE TABLE IF NOT EXISTS fact_sales_p6 PARTITION OF fact_sales FOR VALUES IN (6);
+CREATE TABLE IF NOT EXISTS fact_sales_p7 PARTITION OF fact_sales FOR VALUES IN (7);